@@ -1,18 +1,34 @@
+import argparse
+import atexit
+import io
 import os
 import re
 import time
 import json
+import asyncio
+import base64
+import hashlib
+import heapq
+import random
+import threading
+import zipfile
 import requests
-import pandas as pd
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from xml.sax.saxutils import escape
+from selectolax.lexbor import LexborHTMLParser
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import SessionNotCreatedException
 from webdriver_manager.chrome import ChromeDriverManager
 import google.generativeai as genai
-from PyPDF2 import PdfReader
+from google.generativeai import caching
+import pypdfium2 as pdfium
+import pytesseract
 from docx import Document
 import logging
 from dotenv import load_dotenv
@@ -24,7 +40,376 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Versioned model name; explicit context caching requires a pinned model version
+GEMINI_MODEL = 'models/gemini-1.5-flash-001'
+
+# Candidate profile and scoring instructions, sent once per filtering run as the
+# cached prefix instead of being repeated in every relevance prompt
+PROFILE_PROMPT = """
+Evaluate how relevant each job you are given is for a candidate with the following profile:
+
+Candidate Skills: {skills}
+Candidate Experience: {experience}
+
+Jobs are given as a numbered list. For each job, rate on a scale of 0 to 1 how relevant it is for the candidate.
+Also, extract the key skills required for each job as a Python list.
+
+Respond ONLY in JSON format as an array with one object per job, each with keys
+"id" (int, the number in brackets), "relevance_score" (float) and "required_skills" (list).
+"""
+
+# Explicit context caching needs at least 32,768 prompt tokens; at roughly 4 characters
+# per token, shorter profiles skip the cache attempt rather than make a request that fails
+CONTEXT_CACHE_MIN_CHARS = 32_768 * 4
+
+# Response schemas so Gemini returns well-formed JSON directly
+RESUME_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "skills": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "experience": {"type": "STRING"}
+    },
+    "required": ["skills", "experience"]
+}
+JOB_ANALYSIS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "relevance_score": {"type": "NUMBER"},
+            "required_skills": {"type": "ARRAY", "items": {"type": "STRING"}}
+        },
+        "required": ["id", "relevance_score", "required_skills"]
+    }
+}
+
+# Markdown code fence Gemini sometimes wraps JSON responses in
+JSON_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+# Embedding model for the local similarity prefilter, and the API's per-call batch limit
+EMBEDDING_MODEL = 'models/text-embedding-004'
+EMBEDDING_BATCH_SIZE = 100
+
+# On-disk store of past relevance analyses, and the cosine similarity above which
+# a cached analysis is reused for a near-identical posting
+RELEVANCE_CACHE_PATH = os.path.expanduser("~/.cache/jobagent/relevance_cache.json")
+FUZZY_CACHE_MIN_SIMILARITY = 0.95
+
+# Relevance cache entries older than this are dropped, and the newest are kept up to the cap
+RELEVANCE_CACHE_TTL = timedelta(days=30)
+RELEVANCE_CACHE_MAX_ENTRIES = 20_000
+
+# Common tech skill keywords for the non-LLM fallback extractor
+TECH_KEYWORDS = [
+    'python', 'java', 'javascript', 'c++', 'c#', 'sql', 'html', 'css', 
+    'react', 'angular', 'vue', 'node.js', 'django', 'flask', 'spring', 
+    'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'git',
+    'machine learning', 'deep learning', 'nlp', 'computer vision',
+    'data analysis', 'data science', 'big data', 'hadoop', 'spark',
+    'tableau', 'power bi', 'excel', 'r', 'matlab', 'scala', 'go', 'rust'
+]
+# All keywords in one alternation (longest first) so the text is scanned once; the
+# lookarounds stop short keywords like 'r', 'go' or 'java' matching inside other words
+TECH_KEYWORD_RE = re.compile(
+    r'(?<![\w+#.])(?:' + '|'.join(re.escape(k) for k in sorted(TECH_KEYWORDS, key=len, reverse=True)) + r')(?![\w+#])',
+    re.IGNORECASE
+)
+
+# Section headings that open and close the experience block for the fallback extractor
+EXPERIENCE_START_RE = re.compile(r'\b(?:experience|work history|employment)\b', re.IGNORECASE)
+EXPERIENCE_END_RE = re.compile(r'\b(?:education|skills|certifications)\b', re.IGNORECASE)
+
+# Resume text longer than this is summarized in chunks before skill extraction
+RESUME_PROMPT_MAX_CHARS = 8000
+RESUME_CHUNK_CHARS = 6000
+# Summaries still over the limit are summarized again, at most this many times
+RESUME_MAX_SUMMARY_ROUNDS = 3
+
+# PDFs whose text layer yields fewer characters than this are treated as scanned and OCR'd
+MIN_TEXT_LAYER_CHARS = 200
+# Page render scale for OCR (1.0 = 72 DPI, so ~300 DPI) and Tesseract settings
+OCR_RENDER_SCALE = 300 / 72
+OCR_TESSERACT_CONFIG = '--oem 1 --psm 3'
+
+# Browser user agents rotated across plain HTTP page fetches
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
+]
+
+# Where the resolved ChromeDriver path is remembered between runs
+CHROMEDRIVER_PATH_CACHE = os.path.expanduser("~/.cache/jobagent/chromedriver_path")
+
+# Shared HTTP session so all plain page fetches reuse pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+atexit.register(SESSION.close)
+
+# Upper bound on concurrent plain HTTP page fetches, kept low to avoid rate limiting
+# (and within the session's connection pool)
+MAX_CONCURRENT_PAGE_FETCHES = 4
+
+# Number of headless Chrome instances kept alive for JS-gated pages
+BROWSER_POOL_SIZE = 4
+
+# Subresources the browser never fetches: the scraper only reads the DOM
+# (images are turned off through Chrome settings instead)
+BLOCKED_RESOURCE_PATTERNS = [
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.ogg', '*.mp3', '*.m4a', '*.wav'
+]
+
+# Jobs scored per Gemini call; larger batches mean fewer round-trips, and a batch whose
+# response can't be parsed is retried as two halves
+RELEVANCE_BATCH_SIZE = 20
+
+# Upper bound on in-flight Gemini requests while scoring jobs
+MAX_CONCURRENT_LLM_CALLS = 8
+
+# Default directory for Excel exports
+OUTPUT_DIR = "output"
+
+# Column headers of the Excel export, in row order
+EXPORT_HEADERS = ('Job Title', 'Company', 'Required Skills', 'Relevance Score', 'Apply Link', 'Source')
+
+# Word tokens for skill matching ('node.js', 'c++' and 'c#' stay whole; trailing dots are dropped)
+SKILL_TOKEN_RE = re.compile(r'[a-z0-9+#]+(?:\.[a-z0-9+#]+)*')
+# Filler words inside multi-word skills that shouldn't count as a skill on their own
+SKILL_STOPWORDS = frozenset({'a', 'an', 'and', 'the', 'of', 'or', 'in', 'on', 'for', 'with', 'to'})
+
+# Static parts of the single-sheet .xlsx package written by write_xlsx
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Jobs" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Cell style 0 is the default, style 1 is the bold, centered header and style 2 shows
+# numbers with two decimals (built-in number format 2, "0.00")
+XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1">'
+    '<alignment horizontal="center"/></xf>'
+    '<xf numFmtId="2" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+XLSX_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+)
+XLSX_SHEET_FOOTER = '</sheetData></worksheet>'
+# Control characters that are not allowed anywhere in XML 1.0
+XML_ILLEGAL_CHARS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def chunks(items, size):
+    """Yield successive slices of `items` with at most `size` elements"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _skill_terms(text):
+    """Lowercased words of `text` plus its 2- and 3-word phrases"""
+    tokens = SKILL_TOKEN_RE.findall(text.lower())
+    terms = set(tokens)
+    terms.update(' '.join(tokens[i:i + 2]) for i in range(len(tokens) - 1))
+    terms.update(' '.join(tokens[i:i + 3]) for i in range(len(tokens) - 2))
+    return terms
+
+def _xlsx_cell(value, style=0):
+    """Render one cell: numbers as two-decimal values, everything else as an inline string"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c s="2"><v>{value}</v></c>'
+    style_attr = f' s="{style}"' if style else ''
+    text = escape(XML_ILLEGAL_CHARS_RE.sub('', str(value)))
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+def write_xlsx(output_path, headers, rows, widths):
+    """
+    Write a single-sheet .xlsx by generating the sheet XML directly.
+    The layout is fixed (one bold header row, then plain rows), so the package parts
+    are static strings and rows are streamed into the zip without per-cell objects.
+    """
+    cols = ''.join(
+        f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>'
+        for i, width in enumerate(widths, 1)
+    )
+    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        zf.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        zf.writestr('xl/workbook.xml', XLSX_WORKBOOK)
+        zf.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', XLSX_STYLES)
+        
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            header_row = ''.join(_xlsx_cell(header, style=1) for header in headers)
+            sheet.write(f'{XLSX_SHEET_HEADER}<cols>{cols}</cols><sheetData><row r="1">{header_row}</row>'.encode('utf-8'))
+            
+            # Encode and write rows in blocks to keep the number of write calls low
+            for start in range(0, len(rows), 1000):
+                block = ''.join(
+                    f'<row r="{row_num}">' + ''.join(_xlsx_cell(value) for value in row) + '</row>'
+                    for row_num, row in enumerate(rows[start:start + 1000], start + 2)
+                )
+                sheet.write(block.encode('utf-8'))
+                
+            sheet.write(XLSX_SHEET_FOOTER.encode('utf-8'))
+
+class RelevanceCache:
+    """
+    Job relevance analyses persisted across runs.
+    Entries are keyed by a hash of the job posting and candidate profile; when a job
+    embedding is available, a miss falls back to the nearest cached posting for the
+    same profile if it is similar enough. Embeddings are stored as base64 float16 to
+    keep the file small, and stale entries are evicted on save.
+    """
+    def __init__(self, path=RELEVANCE_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        # Per-profile embedding matrices for the fuzzy tier, built on first lookup
+        self._fuzzy_index = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable relevance cache {path}: {str(e)}")
+        self._upgrade_entries()
+        self._evict()
+    
+    def lookup(self, keys, profile_hash, job_vecs=None):
+        """Return the cached analysis for each key, or None on a miss"""
+        results = [self.entries[key]['analysis'] if key in self.entries else None for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        
+        if job_vecs is None or not misses:
+            return results
+            
+        # Fuzzy tier: nearest neighbor among cached postings scored for this profile
+        index = self._get_fuzzy_index(profile_hash)
+        if index['size'] == 0:
+            return results
+        similarities = job_vecs[misses] @ index['vecs'][:index['size']].T
+        best = similarities.argmax(axis=1)
+        for i, j, similarity in zip(misses, best, similarities[np.arange(len(misses)), best]):
+            if similarity >= FUZZY_CACHE_MIN_SIMILARITY:
+                results[i] = index['analyses'][j]
+        return results
+    
+    def put(self, key, profile_hash, analysis, job_vec=None):
+        """Store an analysis, with the job embedding for fuzzy lookups if available"""
+        self.entries[key] = {
+            'profile': profile_hash,
+            'analysis': analysis,
+            'embedding': self._encode_vec(job_vec) if job_vec is not None else None,
+            'time': time.time()
+        }
+        self.dirty = True
+        if job_vec is not None and profile_hash in self._fuzzy_index:
+            self._append_fuzzy(self._fuzzy_index[profile_hash], job_vec, analysis)
+    
+    def save(self):
+        """Write the cache to disk atomically, if anything changed since the last save"""
+        self._evict()
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+    
+    def _evict(self):
+        """Drop expired entries, then the oldest ones beyond RELEVANCE_CACHE_MAX_ENTRIES"""
+        cutoff = time.time() - RELEVANCE_CACHE_TTL.total_seconds()
+        fresh = {key: entry for key, entry in self.entries.items() if entry['time'] >= cutoff}
+        if len(fresh) > RELEVANCE_CACHE_MAX_ENTRIES:
+            fresh = dict(heapq.nlargest(RELEVANCE_CACHE_MAX_ENTRIES, fresh.items(),
+                                        key=lambda item: item[1]['time']))
+        if len(fresh) < len(self.entries):
+            self.entries = fresh
+            self.dirty = True
+    
+    def _upgrade_entries(self):
+        """Bring entries written before timestamps and packed embeddings up to date"""
+        now = time.time()
+        for entry in self.entries.values():
+            if 'time' not in entry:
+                entry['time'] = now
+                self.dirty = True
+            if isinstance(entry.get('embedding'), list):
+                entry['embedding'] = self._encode_vec(entry['embedding'])
+                self.dirty = True
+    
+    def _get_fuzzy_index(self, profile_hash):
+        """Return the embedding matrix of cached postings for a profile, decoding it once per run"""
+        index = self._fuzzy_index.get(profile_hash)
+        if index is None:
+            index = {'vecs': np.empty((0, 0), dtype=np.float32), 'size': 0, 'analyses': []}
+            for entry in self.entries.values():
+                if entry['profile'] == profile_hash and entry.get('embedding'):
+                    self._append_fuzzy(index, self._decode_vec(entry['embedding']), entry['analysis'])
+            self._fuzzy_index[profile_hash] = index
+        return index
+    
+    def _append_fuzzy(self, index, vec, analysis):
+        """Add a row to a fuzzy index, growing its matrix geometrically"""
+        if index['size'] == len(index['vecs']):
+            grown = np.empty((max(2 * index['size'], 64), len(vec)), dtype=np.float32)
+            if index['size']:
+                grown[:index['size']] = index['vecs']
+            index['vecs'] = grown
+        index['vecs'][index['size']] = vec
+        index['size'] += 1
+        index['analyses'].append(analysis)
+    
+    def _encode_vec(self, vec):
+        """Pack an embedding as base64 float16 for the JSON store"""
+        return base64.b64encode(np.asarray(vec, dtype=np.float16).tobytes()).decode('ascii')
+    
+    def _decode_vec(self, data):
+        """Unpack an embedding stored by _encode_vec"""
+        return np.frombuffer(base64.b64decode(data), dtype=np.float16).astype(np.float32)
+
 class JobScrapingAgent:
+    # ChromeDriver binary path, resolved once per process
+    _chromedriver_path = None
+    
     def __init__(self, gemini_api_key=None):
         """Initialize the job scraping agent with Gemini API key"""
         self.gemini_api_key = gemini_api_key or os.getenv("GEMINI_API_KEY")
@@ -32,51 +417,78 @@ class JobScrapingAgent:
             raise ValueError("Gemini API key not found. Please set GEMINI_API_KEY in .env file or pass it directly.")
         
         genai.configure(api_key=self.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
         self.user_skills = []
         self.user_experience = ""
+        self.user_skills_set = frozenset()
         self.jobs_data = []
+        # Jobs found by the last pipeline scrape, before relevance filtering
+        self.num_scraped = 0
+        self.profile_embedding = None
+        # Hash of the resume text that scopes cached analyses; None until a resume is read
+        self.resume_hash = None
+        self.relevance_cache = RelevanceCache()
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
         
-    def extract_resume_info(self, resume_path):
-        """Extract skills and experience from user's resume"""
-        logger.info(f"Extracting information from resume: {resume_path}")
+        # Model carrying the candidate profile prefix, created on first use per scoring run
+        self._profile_model_task = None
+        self._profile_cache = None
         
-        if not os.path.exists(resume_path):
-            raise FileNotFoundError(f"Resume file not found: {resume_path}")
-            
-        file_extension = os.path.splitext(resume_path)[1].lower()
+        # Browser workers are reused across scrapes; each worker thread owns one driver
+        self._browser_pool = None
+        self._driver_local = threading.local()
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+        
+        # Set to make an in-progress scrape stop at its next page
+        self._scrape_cancel = threading.Event()
+        
+    def extract_resume_info(self, resume):
+        """
+        Extract skills and experience from user's resume
+        Accepts a file path, or the raw file bytes (e.g. from an upload) to skip the disk round-trip
+        """
+        if isinstance(resume, (bytes, bytearray)):
+            logger.info(f"Extracting information from in-memory resume ({len(resume)} bytes)")
+        else:
+            logger.info(f"Extracting information from resume: {resume}")
+        file_extension = self._resume_type(resume)
         
         if file_extension == '.pdf':
-            text = self._extract_pdf_text(resume_path)
-        elif file_extension in ['.docx', '.doc']:
-            text = self._extract_docx_text(resume_path)
+            text = self._extract_pdf_text(resume)
+            if len(text.strip()) < MIN_TEXT_LAYER_CHARS:
+                # Scanned resumes have little or no text layer
+                logger.info("PDF text layer is nearly empty, falling back to OCR")
+                text = self._ocr_pdf(resume) or text
         else:
-            raise ValueError("Unsupported file format. Please provide PDF or DOCX file.")
+            text = self._extract_docx_text(resume)
+        # Hashed before the LLM call: Gemini's extracted profile varies between runs,
+        # the resume text doesn't, so this keeps cached analyses reusable across runs
+        self.resume_hash = hashlib.sha1(' '.join(text.split()).encode('utf-8')).hexdigest()
             
-        # Use Gemini to extract structured information
+        # Use Gemini to extract structured information. The fixed instructions come
+        # before the variable resume text so Gemini's implicit prefix cache can hit.
         prompt = f"""
         Analyze the following resume text and extract:
         1. A list of technical and professional skills (as a Python list)
         2. A summary of professional experience (as a string)
         
-        Resume text:
-        {text}
-        
         Respond ONLY in JSON format with keys "skills" and "experience".
+        
+        Resume text:
+        {self._condense_resume_text(text)}
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            # Clean the response to ensure valid JSON
-            response_text = response.text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-                
-            resume_info = json.loads(response_text)
+            response = self.model.generate_content(prompt, generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=RESUME_SCHEMA
+            ))
+            resume_info = self._parse_llm_json(response)
             self.user_skills = resume_info.get("skills", [])
             self.user_experience = resume_info.get("experience", "")
+            self.user_skills_set = self._build_skill_set(self.user_skills)
+            self.profile_embedding = None
             
             logger.info(f"Extracted {len(self.user_skills)} skills from resume")
             return self.user_skills, self.user_experience
@@ -86,43 +498,123 @@ class JobScrapingAgent:
             # Fallback to basic extraction
             self.user_skills = self._basic_skill_extraction(text)
             self.user_experience = self._basic_experience_extraction(text)
+            self.user_skills_set = self._build_skill_set(self.user_skills)
+            self.profile_embedding = None
             return self.user_skills, self.user_experience
     
-    def _extract_pdf_text(self, pdf_path):
-        """Extract text from PDF file"""
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    
-    def _extract_docx_text(self, docx_path):
-        """Extract text from DOCX file"""
-        doc = Document(docx_path)
-        text = ""
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
+    def _parse_llm_json(self, response):
+        """
+        Parse a Gemini response as JSON, stripping any markdown code fence around it
+        (kept as a safeguard for calls made without a response schema)
+        """
+        return json.loads(JSON_FENCE_RE.sub('', response.text))
+    
+    def _condense_resume_text(self, text):
+        """
+        Bound resume text for the extraction prompt, summarizing long resumes chunk by chunk.
+        If the joined summaries are still too long they are summarized again, so later
+        sections (often the skills list) aren't cut off; truncation is the last resort.
+        """
+        if len(text) <= RESUME_PROMPT_MAX_CHARS:
+            return text
+            
+        logger.info(f"Resume text is {len(text)} characters, summarizing before extraction")
+        try:
+            for _ in range(RESUME_MAX_SUMMARY_ROUNDS):
+                condensed = "\n".join(self._summarize_resume_chunks(list(chunks(text, RESUME_CHUNK_CHARS))))
+                if len(condensed) >= len(text):
+                    break  # Not getting any shorter
+                text = condensed
+                if len(text) <= RESUME_PROMPT_MAX_CHARS:
+                    return text
+        except Exception as e:
+            logger.warning(f"Error summarizing resume, truncating instead: {str(e)}")
+            
+        logger.warning(f"Resume summary is still {len(text)} characters, truncating to {RESUME_PROMPT_MAX_CHARS}")
+        return text[:RESUME_PROMPT_MAX_CHARS]
+    
+    def _summarize_resume_chunks(self, text_chunks):
+        """
+        Summarize resume chunks concurrently, keeping the details skill extraction needs
+        (uses the sync client on threads so no event loop is bound to the async client)
+        """
+        def summarize(chunk):
+            prompt = f"""
+            Condense the following section of a resume. Keep every skill, technology, job title,
+            employer and date, and drop everything else. Respond with plain text only.
+            
+            Resume section:
+            {chunk}
+            """
+            return self.model.generate_content(prompt).text.strip()
+            
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LLM_CALLS) as executor:
+            return list(executor.map(summarize, text_chunks))
+    
+    def _resume_type(self, resume):
+        """
+        Return the file extension of a resume path or bytes, raising if it can't be read
+        (cheap enough to check before starting work that depends on the resume)
+        """
+        if isinstance(resume, (bytes, bytearray)):
+            file_extension = self._detect_resume_type(resume)
+        else:
+            if not os.path.exists(resume):
+                raise FileNotFoundError(f"Resume file not found: {resume}")
+            file_extension = os.path.splitext(resume)[1].lower()
+            
+        if file_extension not in ['.pdf', '.docx', '.doc']:
+            raise ValueError("Unsupported file format. Please provide PDF or DOCX file.")
+        return file_extension
+    
+    def _detect_resume_type(self, data):
+        """Infer the file extension of in-memory resume bytes from their magic number"""
+        if data.startswith(b'%PDF'):
+            return '.pdf'
+        if data.startswith(b'PK'):  # DOCX files are zip archives
+            return '.docx'
+        return None
+    
+    def _extract_pdf_text(self, source):
+        """Extract text from PDF file path or bytes"""
+        # pdfium's C text layer is several times faster than pure-Python parsers
+        pdf = pdfium.PdfDocument(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+        try:
+            page_texts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                page_texts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return "\n".join(page_texts)
+        finally:
+            pdf.close()
+    
+    def _ocr_pdf(self, source):
+        """OCR a PDF by rendering its pages with pdfium and running Tesseract on each"""
+        pdf = pdfium.PdfDocument(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+        try:
+            page_texts = []
+            for page in pdf:
+                image = page.render(scale=OCR_RENDER_SCALE).to_pil()
+                page_texts.append(pytesseract.image_to_string(image, config=OCR_TESSERACT_CONFIG))
+                page.close()
+            return "\n".join(page_texts)
+        except pytesseract.TesseractNotFoundError:
+            logger.warning("Tesseract is not installed; cannot OCR scanned PDF resume")
+            return ""
+        finally:
+            pdf.close()
+    
+    def _extract_docx_text(self, source):
+        """Extract text from DOCX file path or bytes"""
+        doc = Document(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+        return "\n".join(para.text for para in doc.paragraphs)
     
     def _basic_skill_extraction(self, text):
         """Basic skill extraction using keyword matching"""
-        # Common tech skill keywords
-        tech_keywords = [
-            'python', 'java', 'javascript', 'c++', 'c#', 'sql', 'html', 'css', 
-            'react', 'angular', 'vue', 'node.js', 'django', 'flask', 'spring', 
-            'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'git',
-            'machine learning', 'deep learning', 'nlp', 'computer vision',
-            'data analysis', 'data science', 'big data', 'hadoop', 'spark',
-            'tableau', 'power bi', 'excel', 'r', 'matlab', 'scala', 'go', 'rust'
-        ]
-        
-        found_skills = []
-        text_lower = text.lower()
-        for keyword in tech_keywords:
-            if keyword in text_lower:
-                found_skills.append(keyword.title())
-                
-        return list(set(found_skills))
+        found_skills = {match.group(0).lower() for match in TECH_KEYWORD_RE.finditer(text)}
+        return [skill.title() for skill in found_skills]
     
     def _basic_experience_extraction(self, text):
         """Basic experience extraction"""
@@ -132,24 +624,62 @@ class JobScrapingAgent:
         in_experience_section = False
         
         for line in lines:
-            if any(word in line.lower() for word in ['experience', 'work history', 'employment']):
+            if EXPERIENCE_START_RE.search(line):
                 in_experience_section = True
                 continue
-            if in_experience_section and any(word in line.lower() for word in ['education', 'skills', 'certifications']):
+            if in_experience_section and EXPERIENCE_END_RE.search(line):
                 break
             if in_experience_section:
                 experience_lines.append(line)
                 
         return '\n'.join(experience_lines) if experience_lines else "Professional experience details not found."
     
-    def scrape_jobs(self, job_title, location, num_pages=3):
+    def scrape_jobs(self, job_title, location, num_pages=3, on_page=None):
         """
         Scrape job listings from multiple sources
         Currently supports: LinkedIn, Indeed (via scraping - note: check robots.txt)
+        If given, on_page is called with each page's jobs as soon as that page is parsed
         """
         logger.info(f"Scraping jobs for '{job_title}' in '{location}'")
         
-        # We'll use Selenium for dynamic content
+        # Scrape from Indeed (LinkedIn scraping is unreliable due to anti-bot measures)
+        self._scrape_indeed_jobs(job_title, location, num_pages, on_page)
+            
+        logger.info(f"Scraped {len(self.jobs_data)} job listings")
+        return self.jobs_data
+    
+    def close(self):
+        """Shut down pooled browser workers and their Chrome instances"""
+        if self._browser_pool is not None:
+            self._browser_pool.shutdown(wait=True)
+            self._browser_pool = None
+        with self._drivers_lock:
+            for driver in self._drivers:
+                try:
+                    driver.quit()
+                except Exception as e:
+                    logger.warning(f"Error closing Chrome driver: {str(e)}")
+            self._drivers = []
+    
+    def _get_driver(self):
+        """Return the calling worker thread's Chrome driver, starting it on first use"""
+        driver = getattr(self._driver_local, 'driver', None)
+        if driver is None:
+            driver = self._create_chrome_driver()
+            self._driver_local.driver = driver
+            with self._drivers_lock:
+                self._drivers.append(driver)
+        return driver
+    
+    def _render_page(self, url):
+        """Load a page in this worker's browser and return the rendered HTML"""
+        driver = self._get_driver()
+        driver.get(url)
+        time.sleep(3)  # Increased wait time
+        return driver.page_source
+    
+    def _create_chrome_driver(self):
+        """Start a headless Chrome for pages that need JavaScript rendering"""
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
@@ -158,19 +688,82 @@ class JobScrapingAgent:
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         
-        driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=chrome_options)
+        # The scraper only reads the DOM, so skip images (stylesheets, fonts and media
+        # have no content setting and are blocked by URL once the driver is up)
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        })
+        # Return from driver.get() once the DOM is ready rather than after every subresource loads
+        chrome_options.page_load_strategy = 'eager'
         
         try:
-            # Scrape from Indeed (LinkedIn scraping is unreliable due to anti-bot measures)
-            self._scrape_indeed_jobs(driver, job_title, location, num_pages)
+            driver = webdriver.Chrome(service=ChromeService(self._resolve_chromedriver_path()), options=chrome_options)
+        except SessionNotCreatedException as e:
+            # Usually a cached driver left behind by a Chrome auto-update; reinstall and retry once
+            logger.warning(f"ChromeDriver session failed, reinstalling driver: {str(e)}")
+            self._clear_chromedriver_path()
+            driver = webdriver.Chrome(service=ChromeService(self._resolve_chromedriver_path()), options=chrome_options)
             
-        finally:
-            driver.quit()
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCE_PATTERNS})
+        return driver
+    
+    @classmethod
+    def _resolve_chromedriver_path(cls):
+        """
+        Locate the ChromeDriver binary, installing it only when needed.
+        The path is cached on the class for this process and on disk across runs,
+        so webdriver-manager's version check is skipped while the binary still exists.
+        """
+        if cls._chromedriver_path is not None:
+            return cls._chromedriver_path
             
-        logger.info(f"Scraped {len(self.jobs_data)} job listings")
-        return self.jobs_data
+        try:
+            with open(CHROMEDRIVER_PATH_CACHE, 'r', encoding='utf-8') as f:
+                cached_path = f.read().strip()
+            if cached_path and os.path.exists(cached_path):
+                cls._chromedriver_path = cached_path
+                return cached_path
+        except OSError:
+            pass
+            
+        cls._chromedriver_path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(CHROMEDRIVER_PATH_CACHE), exist_ok=True)
+            with open(CHROMEDRIVER_PATH_CACHE, 'w', encoding='utf-8') as f:
+                f.write(cls._chromedriver_path)
+        except OSError as e:
+            logger.warning(f"Could not cache ChromeDriver path: {str(e)}")
+        return cls._chromedriver_path
+    
+    @classmethod
+    def _clear_chromedriver_path(cls):
+        """Forget the cached ChromeDriver path so the next resolve reinstalls it"""
+        cls._chromedriver_path = None
+        try:
+            os.remove(CHROMEDRIVER_PATH_CACHE)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not clear cached ChromeDriver path: {str(e)}")
+    
+    def _fetch_page(self, url):
+        """Fetch a page over plain HTTP, returning its HTML or None on failure"""
+        # Small random jitter instead of a fixed sleep so concurrent requests don't fire in lockstep
+        time.sleep(random.uniform(0.1, 1.0))
+        if self._scrape_cancel.is_set():
+            return None
+        try:
+            response = SESSION.get(url, headers={'User-Agent': random.choice(USER_AGENTS)}, timeout=10)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            logger.warning(f"HTTP fetch failed for {url}: {str(e)}")
+            return None
     
-    def _scrape_indeed_jobs(self, driver, job_title, location, num_pages):
+    def _scrape_indeed_jobs(self, job_title, location, num_pages, on_page=None):
         """Scrape job listings from Indeed"""
         base_url = "https://www.indeed.com/jobs"
         params = {
@@ -185,160 +778,478 @@ class JobScrapingAgent:
         logger.info(f"Scraping Indeed: {url}")
         
         try:
-            for page in range(num_pages):
-                page_url = f"{url}&start={page * 10}"
-                driver.get(page_url)
-                time.sleep(3)  # Increased wait time
-                
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                job_cards = soup.find_all('div', class_='job_seen_beacon')
-                
-                for card in job_cards:
-                    try:
-                        title_elem = card.find('h2', class_='jobTitle')
-                        company_elem = card.find('span', class_='companyName')
-                        link_elem = card.find('a', class_='jcs-JobTitle')
-                        description_elem = card.find('div', class_='job-snippet')
-                        
-                        if title_elem and link_elem:
-                            # Extract title text
-                            title = ""
-                            for span in title_elem.find_all('span'):
-                                if span.get('title'):
-                                    title = span['title']
-                                    break
-                            if not title:
-                                title = title_elem.get_text(strip=True)
-                            
-                            job = {
-                                'title': title,
-                                'company': company_elem.get_text(strip=True) if company_elem else "N/A",
-                                'link': "https://www.indeed.com" + link_elem['href'] if link_elem else "",
-                                'description': description_elem.get_text(strip=True) if description_elem else "",
-                                'source': 'Indeed'
-                            }
-                            self.jobs_data.append(job)
-                    except Exception as e:
-                        logger.warning(f"Error parsing Indeed job card: {str(e)}")
-                        continue
+            page_urls = [f"{url}&start={page * 10}" for page in range(num_pages)]
+            
+            # Result pages are server-rendered, so fetch them all concurrently over HTTP
+            # and hand each one on as soon as it has been parsed
+            gated = []
+            with ThreadPoolExecutor(max_workers=max(min(num_pages, MAX_CONCURRENT_PAGE_FETCHES), 1)) as executor:
+                for page_url, html in zip(page_urls, executor.map(self._fetch_page, page_urls)):
+                    if self._scrape_cancel.is_set():
+                        logger.info("Scrape cancelled")
+                        return
+                    # Pages that were blocked or came back without job cards need a real browser
+                    if html is None or 'job_seen_beacon' not in html:
+                        gated.append(page_url)
+                    else:
+                        self._add_page_jobs(self._parse_indeed_page(html), on_page)
+            
+            if gated and not self._scrape_cancel.is_set():
+                logger.info(f"Falling back to Selenium for {len(gated)} of {len(page_urls)} Indeed pages")
+                if self._browser_pool is None:
+                    self._browser_pool = ThreadPoolExecutor(max_workers=BROWSER_POOL_SIZE)
+                for html in self._browser_pool.map(self._render_page, gated):
+                    if self._scrape_cancel.is_set():
+                        logger.info("Scrape cancelled")
+                        return
+                    self._add_page_jobs(self._parse_indeed_page(html), on_page)
                         
         except Exception as e:
             logger.error(f"Error scraping Indeed: {str(e)}")
     
-    def filter_relevant_jobs(self, min_relevance_score=0.6):
-        """Use Gemini to filter jobs relevant to user's resume"""
+    def _add_page_jobs(self, page_jobs, on_page=None):
+        """Record one page of scraped jobs and pass it on to the page callback"""
+        self.jobs_data.extend(page_jobs)
+        if on_page is not None and page_jobs:
+            on_page(page_jobs)
+    
+    def _parse_indeed_page(self, html):
+        """Parse job cards from an Indeed results page"""
+        tree = LexborHTMLParser(html)
+        job_cards = tree.css('div.job_seen_beacon')
+        page_jobs = []
+        
+        for card in job_cards:
+            try:
+                title_elem = card.css_first('h2.jobTitle')
+                company_elem = card.css_first('span.companyName')
+                link_elem = card.css_first('a.jcs-JobTitle')
+                description_elem = card.css_first('div.job-snippet')
+                
+                if title_elem and link_elem:
+                    # Extract title text
+                    title = ""
+                    title_span = title_elem.css_first('span[title]')
+                    if title_span:
+                        title = title_span.attributes.get('title') or ""
+                    if not title:
+                        title = title_elem.text(strip=True)
+                    
+                    job = {
+                        'title': title,
+                        'company': company_elem.text(strip=True) if company_elem else "N/A",
+                        'link': "https://www.indeed.com" + link_elem.attributes['href'] if link_elem else "",
+                        'description': description_elem.text(strip=True) if description_elem else "",
+                        'source': 'Indeed'
+                    }
+                    page_jobs.append(job)
+            except Exception as e:
+                logger.warning(f"Error parsing Indeed job card: {str(e)}")
+                continue
+                
+        return page_jobs
+    
+    def filter_relevant_jobs(self, min_relevance_score=0.6, batch_size=RELEVANCE_BATCH_SIZE, min_similarity=0.35):
+        """Use Gemini to filter jobs relevant to user's resume (blocking wrapper)"""
+        return asyncio.run(self.filter_relevant_jobs_async(min_relevance_score, batch_size, min_similarity))
+    
+    async def filter_relevant_jobs_async(self, min_relevance_score=0.6, batch_size=RELEVANCE_BATCH_SIZE, min_similarity=0.35):
+        """Use Gemini to filter jobs relevant to user's resume, scoring batches concurrently"""
         logger.info("Filtering relevant jobs using Gemini LLM")
-        relevant_jobs = []
+        jobs = self._dedupe_jobs(self.jobs_data)
+        if len(jobs) < len(self.jobs_data):
+            logger.info(f"Dropped {len(self.jobs_data) - len(jobs)} duplicate job listings")
         
-        for job in self.jobs_data:
-            prompt = f"""
-            Evaluate how relevant this job is for a candidate with the following profile:
-            
-            Candidate Skills: {', '.join(self.user_skills)}
-            Candidate Experience: {self.user_experience}
-            
-            Job Details:
-            Title: {job['title']}
-            Company: {job['company']}
-            Description: {job['description']}
-            
-            On a scale of 0 to 1, how relevant is this job for the candidate?
-            Also, extract the key skills required for this job as a Python list.
+        sem = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+        try:
+            relevant_jobs = await self._score_jobs(jobs, sem, min_relevance_score, batch_size, min_similarity)
+        finally:
+            await self._release_profile_model()
+            self.relevance_cache.save()
             
-            Respond ONLY in JSON format with keys "relevance_score" (float) and "required_skills" (list).
-            """
+        # Sort by relevance score
+        relevant_jobs.sort(key=lambda x: x['relevance_score'], reverse=True)
+        self.jobs_data = relevant_jobs
+        logger.info(f"Filtered to {len(relevant_jobs)} relevant jobs")
+        return relevant_jobs
+    
+    def run_pipeline(self, resume, job_title, location, num_pages=3, min_relevance_score=0.6,
+                     batch_size=RELEVANCE_BATCH_SIZE, min_similarity=0.35):
+        """Extract, scrape and filter as one overlapped pipeline (blocking wrapper)"""
+        return asyncio.run(self.run_pipeline_async(
+            resume, job_title, location, num_pages, min_relevance_score, batch_size, min_similarity
+        ))
+    
+    async def run_pipeline_async(self, resume, job_title, location, num_pages=3, min_relevance_score=0.6,
+                                 batch_size=RELEVANCE_BATCH_SIZE, min_similarity=0.35):
+        """
+        Extract resume info, scrape and filter jobs with the stages overlapped.
+        Resume extraction runs alongside the first page fetches, and scraped pages are
+        queued and scored in mini-batches while later pages are still loading, so wall
+        time is roughly max(scrape, filter) instead of their sum.
+        """
+        loop = asyncio.get_running_loop()
+        page_queue = asyncio.Queue()
+        
+        def on_page(page_jobs):
+            # Called from the scraper's worker threads
+            loop.call_soon_threadsafe(page_queue.put_nowait, page_jobs)
             
+        async def scrape():
             try:
-                response = self.model.generate_content(prompt)
-                response_text = response.text.strip()
-                if response_text.startswith("```json"):
-                    response_text = response_text[7:]
-                if response_text.endswith("```"):
-                    response_text = response_text[:-3]
-                    
-                job_analysis = json.loads(response_text)
-                relevance_score = job_analysis.get("relevance_score", 0)
-                required_skills = job_analysis.get("required_skills", [])
+                await loop.run_in_executor(None, self.scrape_jobs, job_title, location, num_pages, on_page)
+            finally:
+                page_queue.put_nowait(None)
+        
+        # Reject a missing or unsupported resume now rather than after the whole scrape
+        self._resume_type(resume)
+        
+        self.jobs_data = []
+        self._scrape_cancel.clear()
+        resume_task = loop.run_in_executor(None, self.extract_resume_info, resume)
+        scrape_task = asyncio.create_task(scrape())
+        
+        sem = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+        scoring_tasks = []
+        pending = []
+        seen = set()
+        try:
+            # Jobs can only be scored once the candidate profile is known
+            try:
+                await resume_task
+            except Exception:
+                # Stop the scraper at its next page and let it finish before reporting
+                self._scrape_cancel.set()
+                await asyncio.gather(scrape_task, return_exceptions=True)
+                self._scrape_cancel.clear()
+                raise
+            
+            while True:
+                page_jobs = await page_queue.get()
+                if page_jobs is None:
+                    break
+                pending.extend(self._dedupe_jobs(page_jobs, seen))
+                while len(pending) >= batch_size:
+                    scoring_tasks.append(asyncio.create_task(self._score_jobs(
+                        pending[:batch_size], sem, min_relevance_score, batch_size, min_similarity
+                    )))
+                    pending = pending[batch_size:]
+            if pending:
+                scoring_tasks.append(asyncio.create_task(self._score_jobs(
+                    pending, sem, min_relevance_score, batch_size, min_similarity
+                )))
                 
-                if relevance_score >= min_relevance_score:
-                    job['relevance_score'] = relevance_score
-                    job['required_skills'] = required_skills
-                    relevant_jobs.append(job)
-                    
-            except Exception as e:
-                logger.warning(f"Error analyzing job relevance: {str(e)}")
+            await scrape_task
+            scored = await asyncio.gather(*scoring_tasks)
+        finally:
+            await self._release_profile_model()
+            self.relevance_cache.save()
+        
+        relevant_jobs = [job for batch_jobs in scored for job in batch_jobs]
+        relevant_jobs.sort(key=lambda x: x['relevance_score'], reverse=True)
+        self.num_scraped = len(self.jobs_data)
+        logger.info(f"Pipeline kept {len(relevant_jobs)} of {self.num_scraped} scraped jobs")
+        self.jobs_data = relevant_jobs
+        return relevant_jobs
+    
+    def _dedupe_jobs(self, jobs, seen=None):
+        """
+        Drop repeated postings (same title and company, ignoring case), keeping the first.
+        Pass the same `seen` set across calls to dedupe a stream of pages.
+        """
+        seen = set() if seen is None else seen
+        unique_jobs = []
+        for job in jobs:
+            key = (job['title'].strip().lower(), job['company'].strip().lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            unique_jobs.append(job)
+        return unique_jobs
+    
+    async def _score_jobs(self, jobs, sem, min_relevance_score, batch_size, min_similarity):
+        """Prefilter, score and threshold a list of jobs, returning the relevant ones unsorted"""
+        relevant_jobs = []
+        
+        # Drop obvious non-matches before paying for an LLM call on them: first jobs that
+        # mention none of the candidate's skills, then those far from the profile embedding
+        jobs = self._skill_prefilter_jobs(jobs)
+        jobs, job_vecs = await asyncio.to_thread(self._prefilter_jobs, jobs, min_similarity)
+        
+        # Reuse analyses from earlier runs; only cache misses go to Gemini
+        profile_hash = self._profile_hash()
+        keys = [self._job_cache_key(job, profile_hash) for job in jobs]
+        analyses = self.relevance_cache.lookup(keys, profile_hash, job_vecs)
+        misses = [i for i, analysis in enumerate(analyses) if analysis is None]
+        logger.info(f"Relevance cache hits: {len(jobs) - len(misses)} of {len(jobs)} jobs")
+        
+        if misses:
+            profile_model = await self._get_profile_model()
+            batch_results = await asyncio.gather(*(
+                self._analyze_job_batch(profile_model, [jobs[i] for i in batch], sem)
+                for batch in chunks(misses, batch_size)
+            ))
+            
+            for batch, batch_analyses in zip(chunks(misses, batch_size), batch_results):
+                for i, analysis in zip(batch, batch_analyses):
+                    analyses[i] = analysis
+                    if analysis is not None:
+                        self.relevance_cache.put(keys[i], profile_hash, analysis,
+                                                 job_vecs[i] if job_vecs is not None else None)
+        
+        for job, job_analysis in zip(jobs, analyses):
+            if job_analysis is None:
                 # Add job with default values if analysis fails
                 job['relevance_score'] = 0.5
                 job['required_skills'] = ["Skills not extracted"]
                 relevant_jobs.append(job)
+                continue
+                
+            relevance_score = job_analysis.get("relevance_score", 0)
+            required_skills = job_analysis.get("required_skills", [])
+            
+            if relevance_score >= min_relevance_score:
+                job['relevance_score'] = relevance_score
+                job['required_skills'] = required_skills
+                relevant_jobs.append(job)
                 
-        # Sort by relevance score
-        relevant_jobs.sort(key=lambda x: x['relevance_score'], reverse=True)
-        self.jobs_data = relevant_jobs
-        logger.info(f"Filtered to {len(relevant_jobs)} relevant jobs")
         return relevant_jobs
     
-    def export_to_excel(self, output_path=None):
-        """Export job matches to Excel file"""
+    def _build_skill_set(self, skills):
+        """Lowercased skill phrases plus their individual words, for O(1) membership checks"""
+        skill_set = set()
+        for skill in skills:
+            tokens = SKILL_TOKEN_RE.findall(str(skill).lower())
+            if tokens:
+                skill_set.add(' '.join(tokens))
+                skill_set.update(token for token in tokens if token not in SKILL_STOPWORDS)
+        return frozenset(skill_set)
+    
+    def _skill_prefilter_jobs(self, jobs):
+        """Keep only jobs whose title or description mentions at least one candidate skill"""
+        if not self.user_skills_set:
+            return jobs
+            
+        matching_jobs = [
+            job for job in jobs
+            if not self.user_skills_set.isdisjoint(_skill_terms(f"{job['title']} {job['description']}"))
+        ]
+        if len(matching_jobs) < len(jobs):
+            logger.info(f"Skill prefilter dropped {len(jobs) - len(matching_jobs)} of {len(jobs)} jobs with no skill overlap")
+        return matching_jobs
+    
+    def _embed_texts(self, texts):
+        """Embed texts with Gemini, returning a unit-normalized (len(texts), dim) array"""
+        vectors = []
+        for batch in chunks(texts, EMBEDDING_BATCH_SIZE):
+            result = genai.embed_content(model=EMBEDDING_MODEL, content=batch, task_type="semantic_similarity")
+            vectors.extend(result['embedding'])
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    
+    def _prefilter_jobs(self, jobs, min_similarity):
+        """
+        Keep only jobs whose embedding is close enough to the candidate profile.
+        One batched embedding pass plus a dot product per job replaces an LLM
+        call for every obvious non-match. Returns (jobs, embeddings), with
+        embeddings None if the embedding call failed.
+        """
+        if not jobs:
+            return jobs, None
+            
+        try:
+            if self.profile_embedding is None:
+                profile_text = f"{', '.join(self.user_skills)}\n{self.user_experience}"
+                self.profile_embedding = self._embed_texts([profile_text])[0]
+            job_vecs = self._embed_texts([f"{job['title']} {job['description']}" for job in jobs])
+        except Exception as e:
+            logger.warning(f"Embedding prefilter failed, scoring all jobs with Gemini: {str(e)}")
+            return jobs, None
+            
+        scores = job_vecs @ self.profile_embedding
+        keep = scores > min_similarity
+        survivors = [job for job, kept in zip(jobs, keep) if kept]
+        logger.info(f"Embedding prefilter kept {len(survivors)} of {len(jobs)} jobs")
+        return survivors, job_vecs[keep]
+    
+    def _profile_hash(self):
+        """
+        Stable hash of the candidate profile, used to scope cached analyses.
+        This is the resume text hash when a resume was read, so it survives
+        run-to-run variation in the extracted skills and experience summary.
+        """
+        if self.resume_hash is not None:
+            return self.resume_hash
+        profile = json.dumps([self.user_skills, self.user_experience])
+        return hashlib.sha1(profile.encode('utf-8')).hexdigest()
+    
+    def _job_cache_key(self, job, profile_hash):
+        """Exact-match relevance cache key for a job under a given profile"""
+        parts = (job['title'], job['company'], job['description'], profile_hash)
+        return hashlib.sha1("\x1f".join(parts).encode('utf-8')).hexdigest()
+    
+    async def _get_profile_model(self):
+        """
+        Return a model with the candidate profile as its prefix, creating it on first use.
+        Uses Gemini explicit context caching when the profile is long enough, so it is
+        tokenized and billed once per run; call _release_profile_model when done.
+        """
+        if self._profile_model_task is None:
+            # Concurrent scoring batches share a single creation
+            self._profile_model_task = asyncio.ensure_future(self._create_profile_model())
+        return await self._profile_model_task
+    
+    async def _create_profile_model(self):
+        """Build the profile model, off the event loop since caching is a network call"""
+        profile_prompt = PROFILE_PROMPT.format(
+            skills=', '.join(self.user_skills),
+            experience=self.user_experience
+        )
+        if len(profile_prompt) >= CONTEXT_CACHE_MIN_CHARS:
+            try:
+                cache = await asyncio.to_thread(
+                    caching.CachedContent.create,
+                    model=GEMINI_MODEL,
+                    system_instruction=profile_prompt,
+                    ttl=timedelta(hours=1)
+                )
+                self._profile_cache = cache
+                return genai.GenerativeModel.from_cached_content(cache)
+            except Exception as e:
+                logger.info(f"Context caching unavailable, sending profile as system instruction: {str(e)}")
+        return genai.GenerativeModel(GEMINI_MODEL, system_instruction=profile_prompt)
+    
+    async def _release_profile_model(self):
+        """Drop the profile model and delete its context cache, if one was created"""
+        if self._profile_cache is not None:
+            try:
+                await asyncio.to_thread(self._profile_cache.delete)
+            except Exception as e:
+                logger.warning(f"Error deleting context cache: {str(e)}")
+        self._profile_cache = None
+        self._profile_model_task = None
+    
+    async def _analyze_job_batch(self, model, batch, sem):
+        """
+        Score a batch of jobs with a single Gemini call.
+        Returns one analysis dict per job (None where analysis failed).
+        """
+        job_list = "\n".join(
+            f"[{i}] Title: {job['title']} | Company: {job['company']} | Description: {job['description']}"
+            for i, job in enumerate(batch)
+        )
+        prompt = f"""
+        Jobs:
+        {job_list}
+        """
+        
+        try:
+            # The sync client on a worker thread: the SDK's async client is process-wide
+            # and bound to the first event loop, which breaks repeated asyncio.run calls
+            async with sem:
+                response = await asyncio.to_thread(model.generate_content, prompt, generation_config=genai.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=JOB_ANALYSIS_SCHEMA
+                ))
+            analyses = {item["id"]: item for item in self._parse_llm_json(response)}
+            return [analyses.get(i) for i in range(len(batch))]
+            
+        except Exception as e:
+            if len(batch) == 1:
+                logger.warning(f"Error analyzing job relevance: {str(e)}")
+                return [None]
+            # Re-issue as two smaller batches so one bad response doesn't sink the whole batch
+            logger.warning(f"Error analyzing batch of {len(batch)} jobs, retrying in smaller batches: {str(e)}")
+            mid = len(batch) // 2
+            first, second = await asyncio.gather(
+                self._analyze_job_batch(model, batch[:mid], sem),
+                self._analyze_job_batch(model, batch[mid:], sem)
+            )
+            return first + second
+    
+    def export_to_excel(self, output_path=None, segment_size=100_000):
+        """
+        Export job matches to Excel file
+        Large result sets are split into files of at most segment_size rows, written in
+        parallel and numbered _part1, _part2, ...; returns the list of files written
+        """
         if output_path is None:
-            output_path = f"output/job_matches_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            # Nanosecond timestamp keeps names unique even for several exports in the same second
+            output_path = os.path.join(OUTPUT_DIR, f"job_matches_{time.time_ns()}.xlsx")
             
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        logger.info(f"Exporting jobs to Excel: {output_path}")
-        
-        # Prepare data for DataFrame
-        excel_data = []
-        for job in self.jobs_data:
-            excel_data.append({
-                'Job Title': job['title'],
-                'Company': job['company'],
-                'Required Skills': ', '.join(job.get('required_skills', [])),
-                'Relevance Score': f"{job.get('relevance_score', 0):.2f}",
-                'Apply Link': job['link'],
-                'Source': job['source']
-            })
-        
-        # Create DataFrame and export to Excel
-        df = pd.DataFrame(excel_data)
-        df.to_excel(output_path, index=False, engine='openpyxl')
-        
-        # Format Excel file
-        from openpyxl import load_workbook
-        from openpyxl.styles import Font, Alignment
-        
-        wb = load_workbook(output_path)
-        ws = wb.active
-        
-        # Format header
-        for col in ws.iter_cols(min_row=1, max_row=1):
-            for cell in col:
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal="center")
-        
-        # Adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        wb.save(output_path)
-        logger.info(f"Excel file saved successfully: {output_path}")
-        return output_path
-
-def main():
+        # Ensure output directory exists (the default one is created once in __init__)
+        output_dir = os.path.dirname(output_path)
+        if output_dir and output_dir != OUTPUT_DIR:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        segments = list(chunks(self.jobs_data, segment_size)) or [[]]
+        if len(segments) == 1:
+            paths = [output_path]
+        else:
+            root, ext = os.path.splitext(output_path)
+            paths = [f"{root}_part{n}{ext}" for n in range(1, len(segments) + 1)]
+        
+        logger.info(f"Exporting {len(self.jobs_data)} jobs to {len(paths)} Excel file(s): {', '.join(paths)}")
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(segments))) as executor:
+            list(executor.map(self._write_excel_segment, segments, paths))
+            
+        logger.info(f"Excel file(s) saved successfully: {', '.join(paths)}")
+        return paths
+    
+    def _write_excel_segment(self, jobs, output_path):
+        """Write one Excel file for a slice of the job matches"""
+        # Positional rows; the score stays numeric and is shown with two decimals by the cell style
+        excel_data = [
+            (
+                job['title'],
+                job['company'],
+                ', '.join(job.get('required_skills') or ()),
+                round(job.get('relevance_score', 0), 2),
+                job['link'],
+                job['source']
+            )
+            for job in jobs
+        ]
+        
+        # Column widths from a single pass over the raw row values
+        widths = [len(header) for header in EXPORT_HEADERS]
+        for row in excel_data:
+            for i, value in enumerate(row):
+                length = len(value) if isinstance(value, str) else len(str(value))
+                if length > widths[i]:
+                    widths[i] = length
+        
+        write_xlsx(output_path, EXPORT_HEADERS, excel_data, [min(width + 2, 50) for width in widths])
+
+def parse_args(argv=None):
+    """Parse command-line options; anything left out is asked for interactively"""
+    parser = argparse.ArgumentParser(description="Scrape job listings and rank them against your resume with Gemini.")
+    parser.add_argument('--resume', help="Path to resume (PDF or DOCX). If omitted, pick one from the 'resumes' folder interactively")
+    parser.add_argument('--title', help="Job title to search for")
+    parser.add_argument('--location', help="Location to search in")
+    parser.add_argument('--pages', type=int, help="Number of result pages to scrape (default 2)")
+    parser.add_argument('--min-score', type=float, default=0.6, help="Minimum relevance score to keep a job (default 0.6)")
+    parser.add_argument('--output', help="Excel output path (default output/job_matches_<timestamp>.xlsx)")
+    args = parser.parse_args(argv)
+    
+    # With a resume given on the command line the run is non-interactive, so the search terms are required
+    if args.resume is not None and (args.title is None or args.location is None):
+        parser.error("--title and --location are required when --resume is given")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    
     # Initialize the agent
     agent = JobScrapingAgent()
-    
-    # Get user inputs
+    try:
+        run_agent(agent, args)
+    finally:
+        agent.close()
+
+def select_resume():
+    """Let the user pick a resume from the 'resumes' folder; returns None if there is none"""
     print("=== Job Scraping Agent ===")
     print("Make sure your resume is in the 'resumes' folder")
     
@@ -347,12 +1258,15 @@ def main():
     if not os.path.exists(resume_dir):
         os.makedirs(resume_dir)
         print(f"Created '{resume_dir}' directory. Please add your resume there.")
-        return
+        return None
     
-    resume_files = [f for f in os.listdir(resume_dir) if f.endswith(('.pdf', '.docx', '.doc'))]
+    resume_files = [
+        entry.name for entry in os.scandir(resume_dir)
+        if entry.is_file() and entry.name.lower().endswith(('.pdf', '.docx', '.doc'))
+    ]
     if not resume_files:
         print(f"No resume files found in '{resume_dir}' directory. Please add your resume (PDF or DOCX).")
-        return
+        return None
     
     print("\nAvailable resumes:")
     for i, resume in enumerate(resume_files, 1):
@@ -362,48 +1276,53 @@ def main():
         try:
             choice = int(input(f"\nSelect resume (1-{len(resume_files)}): ")) - 1
             if 0 <= choice < len(resume_files):
-                resume_path = os.path.join(resume_dir, resume_files[choice])
-                break
+                return os.path.join(resume_dir, resume_files[choice])
             else:
                 print("Invalid selection. Please try again.")
         except ValueError:
             print("Please enter a valid number.")
+
+def run_agent(agent, args):
+    """Job search flow; options missing from args are asked for interactively"""
+    # Get user inputs
+    resume_path = args.resume
+    if resume_path is None:
+        resume_path = select_resume()
+        if resume_path is None:
+            return
     
-    job_title = input("Enter job title to search for: ").strip()
-    location = input("Enter location: ").strip()
-    num_pages = input("Number of pages to scrape (default 2): ").strip()
-    num_pages = int(num_pages) if num_pages.isdigit() else 2
+    job_title = args.title if args.title is not None else input("Enter job title to search for: ").strip()
+    location = args.location if args.location is not None else input("Enter location: ").strip()
+    num_pages = args.pages
+    if num_pages is None:
+        if args.resume is None:
+            num_pages = input("Number of pages to scrape (default 2): ").strip()
+            num_pages = int(num_pages) if num_pages.isdigit() else 2
+        else:
+            num_pages = 2
     
     try:
-        # Extract resume information
-        print("\nExtracting information from your resume...")
-        agent.extract_resume_info(resume_path)
+        # Extract resume information, scrape jobs and analyze relevance in one overlapped pipeline
+        print(f"\nExtracting resume info, scraping jobs for '{job_title}' in '{location}' and analyzing relevance using AI...")
+        agent.run_pipeline(resume_path, job_title, location, num_pages=num_pages, min_relevance_score=args.min_score)
         print(f"Extracted skills: {', '.join(agent.user_skills[:5])}{'...' if len(agent.user_skills) > 5 else ''}")
         
-        # Scrape jobs
-        print(f"\nScraping jobs for '{job_title}' in '{location}'...")
-        agent.scrape_jobs(job_title, location, num_pages=num_pages)
-        
-        if not agent.jobs_data:
+        if not agent.num_scraped:
             print("No jobs found. Try different search terms or location.")
             return
-        
-        # Filter relevant jobs
-        print("\nAnalyzing job relevance using AI...")
-        agent.filter_relevant_jobs(min_relevance_score=0.6)
-        
         if not agent.jobs_data:
             print("No relevant jobs found based on your resume.")
             return
         
         # Export to Excel
-        output_file = agent.export_to_excel()
+        output_files = agent.export_to_excel(args.output)
         
         print(f"\n✅ Job matching complete!")
-        print(f"📁 Results saved to: {output_file}")
+        print(f"📁 Results saved to: {', '.join(output_files)}")
         print(f"🎯 Found {len(agent.jobs_data)} relevant job matches.")
         print(f"\nTop 3 matches:")
-        for i, job in enumerate(agent.jobs_data[:3], 1):
+        top_matches = heapq.nlargest(3, agent.jobs_data, key=lambda job: job.get('relevance_score', 0))
+        for i, job in enumerate(top_matches, 1):
             print(f"{i}. {job['title']} at {job['company']} (Relevance: {job['relevance_score']:.2f})")
         
     except Exception as e: